@@ -2,23 +2,11 @@ import argparse
 # import subprocess
 import sys
 # import time
-from slurm_util.utils import get_cluster, get_job_nodes
+from slurm_util.utils import get_cluster, get_job_nodes, expand_first_hostname
 import subprocess
 import shutil
 import os
 
-def _expand_first_hostname(nodelist_expr: str) -> str | None:
-    try:
-        result = subprocess.run([
-            "scontrol", "show", "hostnames", nodelist_expr
-        ], capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip().split("\n")[0]
-    except Exception:
-        pass
-    # Fallback: naive parse like foo[01-02] -> foo
-    return nodelist_expr.split(',')[0].split('[')[0]
-
 def _detect_editor_cli() -> str | None:
     # Prefer Cursor if available, else VS Code
     if shutil.which("cursor") is not None:
@@ -39,13 +27,12 @@ def _launch_remote_editor(editor_cli: str, remote_authority: str, working_dir: s
         pass
 
 def attach(job_id, cluster):
-    print(f"Waiting for job {job_id} to be allocated nodes...")
     nodes = get_job_nodes(job_id)
     if not nodes:
         print(f"Job {job_id} submitted, but node information not yet available.")
         print(f"Check job status with: squeue -j {job_id}")
         return 0
-    first_host = _expand_first_hostname(nodes)
+    first_host = expand_first_hostname(nodes)
     # Determine destination port per cluster
     ssh_port = cluster.get_ssh_port(job_id)
     user = os.environ.get("USER", "")
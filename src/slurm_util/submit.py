@@ -3,36 +3,79 @@ import subprocess
 import sys
 import re
 import os
+import shlex
 from slurm_util.utils import (
     format_in_box,
     get_default_slurm_acc,
     get_cluster,
+    get_final_job_state,
+    wait_for_job,
+    CLUSTERS,
     DeviceType,
     Cluster,
+    slurm_binary,
 )
-from slurm_util.attach import attach
 
-def wrap_command(command: str, no_uv: bool, interactive: bool, shell_env: str, dist: bool, stdout_path: str, linger: bool):
+_JOBID_RE = re.compile(r"Submitted batch job (\d+)")
+_DEFAULT_STDOUT_PATH = os.path.expanduser("~/.cache/slurm")
+_CREATED_DIRS: set[str] = set()
+
+def _ensure_dir(path: str) -> None:
+    # Only hit the filesystem the first time a directory is seen in this process
+    if path not in _CREATED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _CREATED_DIRS.add(path)
+
+_WAIT_FOR_SESSION = 'while tmux has-session -t "$SLURM_JOB_ID" 2>/dev/null; do sleep 5; done'
+
+def _tmux_session(command: str = "") -> str:
+    # Detached session, so no pty capture via script(1); block until the session ends
+    if not command:
+        return f'tmux new-session -d -s "$SLURM_JOB_ID"\n{_WAIT_FOR_SESSION}'
+    # The pane restores the batch environment (a tmux server already running on the node
+    # would otherwise hand it a stale one), runs $SLURM_UTIL_CMD and records its exit status.
+    # Every layer is built with shlex.quote, so the user's command is passed through verbatim.
+    # The environment holds the user's credentials, so it goes into a private (0700) mktemp
+    # directory that is removed once the exit status has been read.
+    pane = f'. "$1/env"\n{command}'
+    return "\n".join([
+        'SLURM_UTIL_DIR="$(mktemp -d "${TMPDIR:-/tmp}/slurm_util_$SLURM_JOB_ID.XXXXXX")" || exit 1',
+        'export -p > "$SLURM_UTIL_DIR/env"',
+        'tmux new-session -d -s "$SLURM_JOB_ID" ' + shlex.quote(f"bash -c {shlex.quote(pane)} _ ") + '"$SLURM_UTIL_DIR"',
+        _WAIT_FOR_SESSION,
+        'SLURM_UTIL_STATUS="$(cat "$SLURM_UTIL_DIR/status" 2>/dev/null || echo 1)"',
+        'rm -rf "$SLURM_UTIL_DIR"',
+        'exit "$SLURM_UTIL_STATUS"',
+    ])
+
+def wrap_command(command: str, no_uv: bool, interactive: bool, shell_env: str, dist: bool, stdout_path: str, linger: bool, array_file: str = ""):
     if interactive:
         # return "sleep infinity"
-        return "script -qec \"tmux new-session -s '$SLURM_JOB_ID'\" /dev/null"
-    command = f"{shell_env} {command}" if shell_env else command
+        return _tmux_session()
+    prefix = f"{shell_env} " if shell_env else ""
     if dist:
-        command =  f"torchrun --nproc_per_node gpu --nnodes $SLURM_NNODES --rdzv_backend=c10d --rdzv_endpoint=$MASTER_ADDR:$MASTER_PORT --rdzv_id=$SLURM_JOB_ID {command}"
+        prefix = f"torchrun --nproc_per_node gpu --nnodes $SLURM_NNODES --rdzv_backend=c10d --rdzv_endpoint=$MASTER_ADDR:$MASTER_PORT --rdzv_id=$SLURM_JOB_ID {prefix}"
     if no_uv:
-        command = f"source env.sh && {command}"
+        prefix = f"source env.sh && {prefix}"
     else:
-        command = f"uv run {command}"
+        prefix = f"uv run {prefix}"
+    if array_file:
+        # Each array task runs its own non-empty line of the commands file
+        select = f"grep -v '^[[:space:]]*$' {shlex.quote(array_file)} | sed -n \"${{SLURM_ARRAY_TASK_ID}}p\""
+        cmd_str = shlex.quote(prefix) + f'"$({select})"'
+    else:
+        cmd_str = shlex.quote(prefix + command)
     # wrap in tmux session
-    actual_stdout_file = f"{stdout_path}/$SLURM_JOB_ID.out"
+    actual_stdout_file = shlex.quote(stdout_path) + "/$SLURM_JOB_ID.out"
+    # Subshell, so an exit inside the command still reaches the status file
+    run = f'{{ (eval "$SLURM_UTIL_CMD"); echo $? > "$1/status"; }} 2>&1 | tee {actual_stdout_file}'
     if linger:
         # Keep the tmux session alive after the command exits (success or failure)
-        command = f"script -qec \"tmux new-session -s '$SLURM_JOB_ID' '{command} 2>&1 | tee {actual_stdout_file}; echo Command exited - keeping session alive. Press Ctrl-b d to detach.; exec bash -l'\" /dev/null"
-    else:
-        command = f"script -qec \"tmux new-session -s '$SLURM_JOB_ID' '{command} 2>&1 | tee {actual_stdout_file}'\" /dev/null"
+        run += "; echo Command exited - keeping session alive. Press Ctrl-b d to detach.; exec bash -l"
+    session = _tmux_session(run)
     if dist:
-        command = f"srun --nodes=$SLURM_NNODES --ntasks-per-node=1 {command}"
-    return command
+        session = f"srun --nodes=$SLURM_NNODES --ntasks-per-node=1 bash -c {shlex.quote(session)}"
+    return f"export SLURM_UTIL_CMD={cmd_str}\n{session}"
 def wrap_in_sbatch(
     *,
     command: str,
@@ -50,9 +93,12 @@ def wrap_in_sbatch(
     no_uv: bool,
     dist: bool,
     linger: bool,
+    array: int = 0,
+    array_file: str = "",
 ):
-    stdout_file = stdout_path + "/%A.out"
-    os.makedirs(stdout_path, exist_ok=True)
+    # Array tasks share %A, so give each task its own output file
+    stdout_file = stdout_path + ("/%A_%a.out" if array else "/%A.out")
+    _ensure_dir(stdout_path)
     stdout_str = f"#SBATCH -o {stdout_file}"
     ssh_setup_str = cluster.ssh_setup(no_ssh=no_ssh, custom_ssh_port="$SLURM_JOB_ID")
     resource_alloc_str = cluster.resource_alloc(
@@ -61,26 +107,32 @@ def wrap_in_sbatch(
         cpus_per_gpu=cpus_per_gpu,
         nodes=nodes,
     )
-    command = wrap_command(command, no_uv, interactive, shell_env, dist, stdout_path, linger)
+    # Array tasks must not linger, or each one would sit idle until the time limit
+    command = wrap_command(command, no_uv, interactive, shell_env, dist, stdout_path, linger and not array, array_file)
     jobname_str = "#SBATCH -J interactive" if interactive else ""
-    sbatch_command = f"""#!/bin/bash
-#SBATCH -A {account}
-#SBATCH -t {time_alloc}
-#SBATCH --mail-type=ALL
-{jobname_str}
-{resource_alloc_str}
-{stdout_str}
-{ssh_setup_str}
-export MASTER_ADDR=$(scontrol show hostnames "$SLURM_NODELIST" | head -n 1)
-base=15000; range=20000
-export MASTER_PORT=$((base + (SLURM_JOB_ID % range)))
-export CLUSTER={cluster.name}
-{command}
-"""
-    return sbatch_command
+    lines = [
+        "#!/bin/bash",
+        f"#SBATCH -A {account}",
+        f"#SBATCH -t {time_alloc}",
+        "#SBATCH --mail-type=ALL",
+        f"#SBATCH --array=1-{array}" if array else "",
+        jobname_str,
+        resource_alloc_str,
+        stdout_str,
+        ssh_setup_str,
+        'export MASTER_ADDR=$(scontrol show hostnames "$SLURM_NODELIST" | head -n 1)',
+        "base=15000; range=20000",
+        "export MASTER_PORT=$((base + (SLURM_JOB_ID % range)))",
+        f"export CLUSTER={cluster.name}",
+        command,
+    ]
+    # Drop empty optional sections so the script has no stray blank lines
+    return "\n".join(line for line in lines if line) + "\n"
 
 def _parse_job_id_from_stdout(stdout: str) -> str | None:
-    match = re.search(r"Submitted batch job (\d+)", stdout)
+    # sbatch reports the job id on its first line
+    first_line = stdout.partition("\n")[0]
+    match = _JOBID_RE.search(first_line)
     return match.group(1) if match else None
 
     
@@ -90,8 +142,9 @@ def validate_args(args):
         raise ValueError("Command is required when not running interactively.")
 
 def main():
-    cluster = get_cluster()
-    default_stdout = os.path.expanduser("~/.cache/slurm")
+    # The cluster lookup runs sacctmgr, so it only happens after parsing and --help stays local
+    device_types = list(dict.fromkeys(t for cls in CLUSTERS.values() for t in cls.DeviceType.__args__))
+    default_stdout = _DEFAULT_STDOUT_PATH
     default_nodes = 1
     default_cpus_per_gpu = 16
     default_time = "0-00:30:00"
@@ -105,9 +158,15 @@ def main():
     parser.add_argument(
         "--dry_run", help="Whether to submit the job or not", action="store_true"
     )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Always print the sbatch script before submitting (default: only when stdout is a terminal)",
+    )
     parser.add_argument(
         "--blocking",
-        help="Block until job completes before returning",
+        help="Block until job completes before returning; exits non-zero unless the job completed (implies --no-linger)",
         action="store_true",
     )
     parser.add_argument(
@@ -122,9 +181,9 @@ def main():
         "--device_type",
         "-d",
         required=False,
-        help=f"Device type. (default: {cluster.DefaultDeviceType})",
-        choices=cluster.DeviceType.__args__,
-        default=cluster.DefaultDeviceType,
+        help="Device type. (default: " + ", ".join(f"{name}: {cls.DefaultDeviceType}" for name, cls in CLUSTERS.items()) + ")",
+        choices=device_types,
+        default=None,
     )
 
     parser.add_argument(
@@ -138,8 +197,8 @@ def main():
         "--account",
         "-a",
         required=False,
-        help="SLURM account number to use",
-        default=get_default_slurm_acc(),
+        help="SLURM account number to use (default: first account associated with $USER)",
+        default=None,
     )
     parser.add_argument(
         "--time",
@@ -177,8 +236,8 @@ def main():
     )
     parser.add_argument(
         "--jump_host",
-        default=cluster.name,
-        help=f"SSH jump host alias or host to use (default: {cluster.name})",
+        default=None,
+        help="SSH jump host alias or host to use (default: the cluster name)",
     )
     parser.add_argument(
         "--no-uv",
@@ -192,6 +251,12 @@ def main():
         type=str,
         help=f"Path to stdout folder (default: {default_stdout})",
     )
+    parser.add_argument(
+        "--array",
+        metavar="CMDS_FILE",
+        default=None,
+        help="Submit a single job array with one task per non-empty line of CMDS_FILE instead of a single command (implies --no-linger)",
+    )
     parser.add_argument(
         "command",
         nargs=argparse.REMAINDER,
@@ -199,8 +264,30 @@ def main():
     )
 
     args = parser.parse_args()
+    # One fused sacctmgr query yields both the cluster and the default account
+    cluster = get_cluster()
+    if args.device_type is None:
+        args.device_type = cluster.DefaultDeviceType
+    elif args.device_type not in cluster.DeviceType.__args__:
+        parser.error(f"argument --device_type/-d: {args.device_type!r} is not available on {cluster.name}")
+    if args.jump_host is None:
+        args.jump_host = cluster.name
+    if args.account is None:
+        args.account = get_default_slurm_acc()
+    command = " ".join(args.command)
+    array = 0
+    if args.array:
+        if args.interactive or command:
+            parser.error("--array cannot be combined with --interactive or a command")
+        array_file = os.path.abspath(args.array)
+        with open(array_file) as f:
+            array = sum(1 for line in f if line.strip())
+        if not array:
+            parser.error(f"--array: no commands in {args.array}")
+    else:
+        array_file = ""
     sbatch_command = wrap_in_sbatch(
-        command=" ".join(args.command),
+        command=command,
         account=args.account,
         gpus_per_node=args.gpus_per_node,
         cpus_per_gpu=args.cpus_per_gpu,
@@ -214,26 +301,73 @@ def main():
         cluster=cluster,
         no_uv=args.no_uv,
         dist=args.dist,
-        linger=not args.no_linger,
+        # A lingering session never ends, so a blocking submit would wait out the walltime
+        linger=not (args.no_linger or args.blocking),
+        array=array,
+        array_file=array_file,
     )
 
     if not args.dry_run:
-        print("Running the following sbatch script:")
-        print(format_in_box(sbatch_command))
-        result = subprocess.run(
-            ["sbatch"], input=sbatch_command, text=True, capture_output=True
+        if args.verbose or sys.stdout.isatty():
+            print("Running the following sbatch script:")
+            print(format_in_box(sbatch_command))
+        # Let sbatch block until the job finishes rather than polling the controller.
+        # Interactive jobs still need to be attached to while they run.
+        use_sbatch_wait = args.blocking and not args.interactive and cluster.supports_sbatch_wait
+        proc = subprocess.Popen(
+            [slurm_binary("sbatch"), "--wait"] if use_sbatch_wait else [slurm_binary("sbatch")],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True,
+            # Unbuffered, so reading the first line below cannot swallow output communicate() needs
+            bufsize=0,
         )
-        print(result.stdout)
-        if result.returncode != 0:
-            print(f"Failed to submit job: {result.stderr}")
+        # Hand sbatch the encoded script directly, skipping the text-mode wrappers
+        try:
+            proc.stdin.write(sbatch_command.encode("utf-8"))
+        except BrokenPipeError:
+            pass  # sbatch exited early; its stderr says why
+        proc.stdin.close()
+        proc.stdin = None
+        # sbatch prints the job id as soon as the job is submitted, and with --wait
+        # only exits once it has finished, so show the id before waiting
+        first_line = proc.stdout.readline().decode("utf-8", errors="replace")
+        print(first_line, end="", flush=True)
+        if use_sbatch_wait and first_line:
+            print("Waiting for the job to finish (sbatch --wait)...", flush=True)
+        try:
+            out, err = proc.communicate()
+        except KeyboardInterrupt:
+            print("Keyboard interrupt, exiting...", file=sys.stderr, flush=True)
+            return 1
+        rest, stderr = out.decode("utf-8", errors="replace"), err.decode("utf-8", errors="replace")
+        print(rest, end="")
+        stdout = first_line + rest
+        job_id = _parse_job_id_from_stdout(stdout)
+        # With --wait a non-zero exit code can also mean the job itself failed
+        if proc.returncode != 0 and not (use_sbatch_wait and job_id):
+            print(f"Failed to submit job: {stderr}")
             return 1
-        job_id = _parse_job_id_from_stdout(result.stdout)
         if not job_id:
             print("Could not parse job ID from sbatch output; skipping interactive attach.")
             return 0
         # Interactive workflow: wait for node assignment and open remote editor
         if args.interactive:
+            from slurm_util.attach import attach
             attach(job_id, cluster)
+        if args.blocking:
+            if use_sbatch_wait:
+                # The job has already ended, so a single (briefly retried) sacct query settles it
+                state = get_final_job_state(job_id)
+                if state is None:
+                    # No accounting record, so trust sbatch's own exit code
+                    return 0 if proc.returncode == 0 else 1
+                print(f"Job {job_id} finished with state {state}")
+            else:
+                state = wait_for_job([job_id]).get(job_id)
+            if state != "COMPLETED":
+                return 1
     else:
         print(
             "If dry run was disabled, the following sbatch command would have been run:"
@@ -1,59 +1,61 @@
-from abc import ABC, abstractmethod
+from functools import lru_cache
 import subprocess
+import sys
 import time
-import re
 import os
 from typing import Literal, Union
 
+
+@lru_cache(maxsize=None)
+def slurm_binary(name):
+    """Absolute path of a Slurm client, searched for on first use rather than at import."""
+    import shutil
+    return shutil.which(name) or name
+
+
 def trim_whitespace(s):
-    return "\n".join([line.strip() for line in s.split("\n") if line.strip()])
+    return "\n".join(filter(None, (line.strip() for line in s.splitlines())))
+
+
+_BOX_ROW = "│ {} │".format
+
+
+@lru_cache(maxsize=None)
+def _box_borders(line_width):
+    box_width = line_width + 2  # +2 for the border characters
+    return "┌" + "─" * box_width + "┐", "└" + "─" * box_width + "┘"
+
 
 def format_in_box(text, line_width=76):
     """Format text in a box with specified line width."""
-    box_width = line_width + 2  # +2 for the border characters
-    lines = []
-    lines.append("┌" + "─" * box_width + "┐")
-    
-    for line in text.strip().split('\n'):
-        if len(line) <= line_width:
-            lines.append(f"│ {line:<{line_width}} │")
-        else:
-            # Wrap long lines
-            while len(line) > line_width:
-                lines.append(f"│ {line[:line_width]:<{line_width}} │")
-                line = line[line_width:]
-            if line:  # Print remaining part if any
-                lines.append(f"│ {line:<{line_width}} │")
-    
-    lines.append("└" + "─" * box_width + "┘")
-    return '\n'.join(lines)
-
-class Cluster(ABC):
-    name: str
-    @abstractmethod
-    def resource_alloc(self, *, gpus_per_node, cpus_per_gpu, nodes) -> str:
-        pass
+    top, bottom = _box_borders(line_width)
+    rows = [
+        _BOX_ROW(chunk.ljust(line_width))
+        for line in text.strip().split('\n')
+        # Wrap long lines into fixed-width chunks
+        for chunk in [line[i:i + line_width] for i in range(0, len(line), line_width)] or [""]
+    ]
+    return '\n'.join([top, *rows, bottom])
 
-    def ssh_setup(self, *, no_ssh, custom_ssh_port) -> str:
-        if no_ssh:
-            return ""
+
+@lru_cache(maxsize=1)
+def _ssh_setup_script() -> str:
+    # Use job-specific directory and port calculation
+    return trim_whitespace("""
+        # Calculate unique SSH port based on job ID (base port 10000 + job_id % 55000)
+        SSH_PORT=$((10000 + $SLURM_JOB_ID % 55000))
+        JOB_SSH_DIR="/tmp/slurm_ssh_$SLURM_JOB_ID"
+        
+        # Create job-specific SSH directory
+        mkdir -p "$JOB_SSH_DIR"
+        
+        # Generate SSH host key if it doesn't exist
+        if [ ! -f "$JOB_SSH_DIR/ssh_host_key" ]; then
+            ssh-keygen -t rsa -f "$JOB_SSH_DIR/ssh_host_key" -N '' -q
+        fi
         
-        # Use job-specific directory and port calculation
-        return trim_whitespace("""
-            # Calculate unique SSH port based on job ID (base port 10000 + job_id % 55000)
-            SSH_PORT=$((10000 + $SLURM_JOB_ID % 55000))
-            JOB_SSH_DIR="/tmp/slurm_ssh_$SLURM_JOB_ID"
-            
-            # Create job-specific SSH directory
-            mkdir -p "$JOB_SSH_DIR"
-            
-            # Generate SSH host key if it doesn't exist
-            if [ ! -f "$JOB_SSH_DIR/ssh_host_key" ]; then
-                ssh-keygen -t rsa -f "$JOB_SSH_DIR/ssh_host_key" -N '' -q
-            fi
-            
-            # Create sshd_config for this job
-            cat > "$JOB_SSH_DIR/sshd_config" << EOF
+        # Create sshd_config for this job
+        cat > "$JOB_SSH_DIR/sshd_config" << EOF
 Port $SSH_PORT
 PidFile $JOB_SSH_DIR/sshd.pid
 HostKey $JOB_SSH_DIR/ssh_host_key
@@ -63,13 +65,27 @@ PubkeyAuthentication yes
 ChallengeResponseAuthentication no
 Subsystem sftp internal-sftp
 EOF
-            
-            # Start SSH daemon in background
-            /usr/sbin/sshd -f "$JOB_SSH_DIR/sshd_config" -D &
-            
-            # Store the SSH port for later use
-            echo "$SSH_PORT" > "$JOB_SSH_DIR/ssh_port"
-            """).strip()
+        
+        # Start SSH daemon in background
+        /usr/sbin/sshd -f "$JOB_SSH_DIR/sshd_config" -D &
+        
+        # Store the SSH port for later use
+        echo "$SSH_PORT" > "$JOB_SSH_DIR/ssh_port"
+        """).strip()
+
+
+class Cluster:
+    __slots__ = ()
+    name: str
+    # Whether `sbatch --wait` may be used to block until a job finishes instead of polling
+    supports_sbatch_wait: bool = True
+    def resource_alloc(self, *, gpus_per_node, cpus_per_gpu, nodes) -> str:
+        raise NotImplementedError
+
+    def ssh_setup(self, *, no_ssh, custom_ssh_port) -> str:
+        if no_ssh:
+            return ""
+        return _ssh_setup_script()
 
     def get_ssh_port(self, job_id):
         return 10000 + (int(job_id) % 55000)
@@ -77,7 +93,22 @@ EOF
 
 
 
+@lru_cache(maxsize=64)
+def _alvis_alloc(gpus_per_node: int, gpu_model: str, cpus_per_node: int, nodes: int) -> str:
+    gpu_alloc = f"--gpus-per-node {gpu_model}:{gpus_per_node}" if gpu_model else "-C NOGPU"
+    cpu_alloc = f"--cpus-per-task {cpus_per_node}"
+    task_alloc = "--ntasks-per-node 1"
+    node_alloc = f"--nodes {nodes}"
+    return trim_whitespace(f"""
+        #SBATCH {gpu_alloc}
+        #SBATCH {cpu_alloc}
+        #SBATCH {task_alloc}
+        #SBATCH {node_alloc}
+            """)
+
+
 class Alvis(Cluster):
+    __slots__ = ()
     name = "alvis"
     DeviceType = Literal["A100:40GB", "A100:80GB", "A40", "V100", "T4", "cpu"]
     DefaultDeviceType: DeviceType = "A100:40GB"
@@ -91,138 +122,346 @@ class Alvis(Cluster):
         "cpu": "",
     }
     def resource_alloc(self, *, gpus_per_node: int, device_type: DeviceType, cpus_per_gpu: int, nodes: int) -> str:
-        device_type_alvis = self._map_to_alvis_naming[device_type]
-        gpu_alloc = f"--gpus-per-node {device_type_alvis}:{gpus_per_node}" if device_type != "cpu" else "-C NOGPU"
-        cpu_alloc = f"--cpus-per-task {cpus_per_gpu*gpus_per_node}"  # one task per node, CPUs = GPUs * CPUs per GPU
-        task_alloc = "--ntasks-per-node 1"
-        node_alloc = f"--nodes {nodes}"
-        return trim_whitespace(f"""
-            #SBATCH {gpu_alloc}
-            #SBATCH {cpu_alloc}
-            #SBATCH {task_alloc}
-            #SBATCH {node_alloc}
-                """)
+        # one task per node, CPUs = GPUs * CPUs per GPU
+        return _alvis_alloc(gpus_per_node, self._map_to_alvis_naming[device_type], cpus_per_gpu*gpus_per_node, nodes)
+
+
+@lru_cache(maxsize=64)
+def _berzelius_alloc(gpus_per_node: int, device_type: str, cpus_per_node: int, nodes: int) -> str:
+    gpu_alloc = f"#SBATCH --gpus-per-node {gpus_per_node}" if device_type != "cpu" else "#SBATCH --partition=berzelius-cpu"    
+    if device_type == "A100:80GB":
+        gpu_alloc += "\n#SBATCH -C fat"
+    elif device_type == "A100:40GB":
+        gpu_alloc += "\n#SBATCH -C thin"
+    elif device_type == "A100:10GB":
+        gpu_alloc += "\n#SBATCH --reservation=1g.10gb"
+    # Use one Slurm task per node when launching with torchrun under srun
+    task_alloc = "#SBATCH --ntasks-per-node 1"
+    cpu_alloc = f"#SBATCH --cpus-per-task {cpus_per_node}"# if device_type != "cpu" else ""
+    node_alloc = f"#SBATCH --nodes {nodes}"
+    alloc_str = trim_whitespace(f"""
+        {gpu_alloc}
+        {task_alloc}
+        {cpu_alloc}
+        {node_alloc}
+            """)
+    return alloc_str
 
 
 class Berzelius(Cluster):
+    __slots__ = ()
     name = "berzelius"
     DeviceType = Literal["A100","A100:80GB", "A100:40GB", "A100:10GB", "cpu"]
     DefaultDeviceType: DeviceType = "A100"
     """https://www.nsc.liu.se/support/systems/berzelius-gpu/#21-resource-allocation-guidelines"""
     def resource_alloc(self, *, gpus_per_node: int, device_type: DeviceType, cpus_per_gpu: int, nodes: int) -> str:
-        gpu_alloc = f"#SBATCH --gpus-per-node {gpus_per_node}" if device_type != "cpu" else "#SBATCH --partition=berzelius-cpu"    
-        if device_type == "A100:80GB":
-            gpu_alloc += "\n#SBATCH -C fat"
-        elif device_type == "A100:40GB":
-            gpu_alloc += "\n#SBATCH -C thin"
-        elif device_type == "A100:10GB":
-            gpu_alloc += "\n#SBATCH --reservation=1g.10gb"
-        # Use one Slurm task per node when launching with torchrun under srun
-        task_alloc = "#SBATCH --ntasks-per-node 1"
-        cpu_alloc = f"#SBATCH --cpus-per-task {cpus_per_gpu*gpus_per_node}"# if device_type != "cpu" else ""
-        node_alloc = f"#SBATCH --nodes {nodes}"
-        alloc_str = trim_whitespace(f"""
-            {gpu_alloc}
-            {task_alloc}
-            {cpu_alloc}
-            {node_alloc}
-                """)
-        return alloc_str
+        return _berzelius_alloc(gpus_per_node, device_type, cpus_per_gpu*gpus_per_node, nodes)
+
+
+CLUSTERS: dict[str, type[Cluster]] = {cls.name: cls for cls in (Alvis, Berzelius)}
+
+
+@lru_cache(maxsize=1)
+def _sacctmgr_association():
+    """(account, cluster) of the first association of $USER, from a single sacctmgr call."""
+    result = subprocess.run(
+        [slurm_binary("sacctmgr"), "show", "association", "where", f"user={os.environ.get('USER', '')}",
+         "format=Account,Cluster", "--noheader", "--parsable2"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"sacctmgr failed: {result.stderr.strip()}")
+    account, _, cluster = result.stdout.partition("\n")[0].partition("|")
+    return account.strip(), cluster.strip()
 
 
 def get_default_slurm_acc():
-    import os
-    with os.popen("sacctmgr show association where user=$USER format=Account --noheader --parsable | cut -d'|' -f1") as f:
-        return f.read().split("\n")[0]
+    return _sacctmgr_association()[0]
 
 
+@lru_cache(maxsize=1)
 def get_cluster():
-    with os.popen("sacctmgr show association where user=$USER format=Cluster --noheader") as f:
-        clustr_str = trim_whitespace(f.read().split("\n")[0])
-    if clustr_str == "alvis":
-        return Alvis()
-    elif clustr_str == "berzelius":
-        return Berzelius()
-    else:
-        raise ValueError(f"Cluster {clustr_str} not supported")
+    clustr_str = _sacctmgr_association()[1]
+    try:
+        return CLUSTERS[clustr_str]()
+    except KeyError:
+        raise ValueError(f"Cluster {clustr_str} not supported") from None
+
+
+_NODE_CACHE: dict[str, tuple[float, str]] = {}
+_NODE_CACHE_TTL = 30.0  # seconds
+_SQUEUE_CACHE: dict[tuple[str, ...], tuple[float, subprocess.CompletedProcess]] = {}
+_SQUEUE_CACHE_TTL = 5.0  # seconds
+
+
+def _run_squeue(args, fresh=False):
+    """Run squeue, reusing successful output from an identical call made within the last few seconds.
+
+    With fresh=True squeue is always called, e.g. by a polling loop that needs new state on every poll.
+    """
+    key = tuple(args)
+    cached = _SQUEUE_CACHE.get(key)
+    if not fresh and cached is not None and time.monotonic() - cached[0] < _SQUEUE_CACHE_TTL:
+        return cached[1]
+    result = subprocess.run([slurm_binary("squeue"), *args], capture_output=True, text=True)
+    if result.returncode == 0:
+        _SQUEUE_CACHE[key] = (time.monotonic(), result)
+    return result
+
+
+@lru_cache(maxsize=1)
+def _squeue_supports_json():
+    """Whether squeue understands --json, checked once from its local help text."""
+    result = subprocess.run([slurm_binary("squeue"), "--help"], capture_output=True, text=True)
+    return "--json" in result.stdout
+
+
+def _squeue_job_record(job_id, fresh=False):
+    """Full job record from `squeue --json`, {} if the job is not in the queue and None if squeue failed."""
+    import json
+    result = _run_squeue(["-j", job_id, "--json"], fresh=fresh)
+    if result.returncode != 0:
+        return None
+    try:
+        jobs = json.loads(result.stdout)["jobs"]
+    except (ValueError, KeyError):
+        return None
+    # Some Slurm versions ignore -j together with --json, so never trust the first record
+    return next((job for job in jobs if str(job.get("job_id")) == str(job_id)), {})
+
+
+# Only once a job is running is its nodelist final and its sshd reachable
+_ALLOCATED_STATES = {"RUNNING", "COMPLETING"}
+
+
+def _query_job_nodes(job_id, fresh=False):
+    """Single squeue query for the nodes and state of a SLURM job.
+
+    Nodes are None until the job is running, and the state is None if the query failed.
+    """
+    if _squeue_supports_json():
+        job = _squeue_job_record(job_id, fresh=fresh)
+        if job is None:
+            return None, None
+        if not job:
+            return None, "not in queue"
+        states = job.get("job_state", [])
+        if isinstance(states, str):  # older Slurm versions report a single state
+            states = [states]
+        state = ",".join(states)
+        reason = job.get("state_reason", "None")
+        status = state if reason == "None" else f"{state}, reason: {reason}"
+        # A job still CONFIGURING (e.g. booting nodes) is not ready, as in the text path below
+        ready = _ALLOCATED_STATES.intersection(states) and "CONFIGURING" not in states
+        nodes = job.get("nodes") if ready else None
+        return nodes or None, status
+
+    result = _run_squeue(["-j", job_id, "--noheader", "--format=%T|%N"], fresh=fresh)
+    if result.returncode != 0:
+        return None, None
+    state, _, nodes = result.stdout.strip().partition("|")
+    if nodes and state in _ALLOCATED_STATES:
+        return nodes, state
+    return None, state
+
+
+class _StatusPrinter:
+    """Write polling status to stderr, but only when the message changes."""
+
+    def __init__(self):
+        self._last = None
+
+    def __call__(self, msg):
+        if msg != self._last:
+            sys.stderr.write(msg + "\n")
+            sys.stderr.flush()
+            self._last = msg
+
+
+def _poll_delays(initial, maximum, budget, factor=2.0):
+    """Yield exponentially growing, jittered sleep times until the time budget is spent."""
+    import random
+    deadline = time.monotonic() + budget
+    delay = initial
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        # Jitter keeps concurrent pollers from hitting the controller in lockstep
+        yield min(delay + random.uniform(0, 1), remaining)
+        delay = min(delay * factor, maximum)
+
 
 def get_job_nodes(job_id):
     """Get the nodes allocated to a SLURM job."""
-    max_attempts = 30  # Wait up to 5 minutes for job to start
-    attempt = 0
-    
-    while attempt < max_attempts:
-        # Try to get node information from squeue
-        result = subprocess.run(
-            ["squeue", "-j", job_id, "--noheader", "--format=%N"],
-            capture_output=True, text=True
-        )
-        
-        if result.returncode == 0 and result.stdout.strip():
-            nodes = result.stdout.strip()
-            if nodes and nodes != "(null)" and "(" not in nodes:  # Job has started
-                return nodes
-        
-        # If not found in squeue, try scontrol
-        result = subprocess.run(
-            ["scontrol", "show", "job", job_id],
-            capture_output=True, text=True
-        )
-        
-        if result.returncode == 0:
-            # Look for NodeList in the output
-            for line in result.stdout.split('\n'):
-                if 'NodeList=' in line:
-                    node_match = re.search(r'NodeList=(\S+)', line)
-                    if node_match:
-                        nodes = node_match.group(1)
-                        if nodes and nodes != "(null)" and nodes != "N/A":
-                            return nodes
+    # Inside the job's own allocation the nodelist is already in the environment
+    env_nodes = os.environ.get("SLURM_JOB_NODELIST")
+    if env_nodes and os.environ.get("SLURM_JOB_ID") == str(job_id):
+        return env_nodes
+
+    cached = _NODE_CACHE.get(job_id)
+    if cached is not None and time.monotonic() - cached[0] < _NODE_CACHE_TTL:
+        return cached[1]
+
+    initial = float(os.environ.get("SLURM_UTIL_POLL_INITIAL", 1))
+    maximum = float(os.environ.get("SLURM_UTIL_POLL_MAX", 30))
+    budget = float(os.environ.get("SLURM_UTIL_POLL_BUDGET", 300))  # Wait up to 5 minutes for job to start
+    status = _StatusPrinter()
+
+    for poll, delay in enumerate(_poll_delays(initial, maximum, budget)):
+        # Only the first poll may reuse another caller's recent result; later polls
+        # come sooner than the cache expires and must see the job's current state
+        nodes, state = _query_job_nodes(job_id, fresh=poll > 0)
+        if nodes:
+            _NODE_CACHE[job_id] = (time.monotonic(), nodes)
+            return nodes
+        status(f"Waiting for job {job_id} to be allocated nodes... ({state or 'unknown'})")
         try:
-            time.sleep(10)
+            time.sleep(delay)
         except KeyboardInterrupt:
-            print("Keyboard interrupt, exiting...", flush=True)
+            status("Keyboard interrupt, exiting...")
             return None
-        attempt += 1
-        print(f"Waiting for job {job_id} to be allocated nodes... (attempt {attempt}/{max_attempts})", flush=True)
-    
+
     return None
 
 
+_ACTIVE_STATES = {"PENDING", "CONFIGURING", "RUNNING", "COMPLETING", "SUSPENDED", "REQUEUED", "RESIZING"}
+# Consecutive polls where sacct failed or knew none of the pending jobs before wait_for_job gives up
+_MAX_SACCT_MISSES = 10
+
+
+def get_job_states(job_ids):
+    """States of SLURM jobs from one batched sacct call."""
+    result = subprocess.run(
+        [slurm_binary("sacct"), "-j", ",".join(job_ids), "-X", "--noheader", "--format=JobID,State", "-P"],
+        capture_output=True, text=True
+    )
+    states = {}
+    if result.returncode == 0:
+        for line in result.stdout.splitlines():
+            job_id, _, state = line.partition("|")
+            if state:
+                # e.g. "CANCELLED by 1234" -> "CANCELLED"
+                states[job_id.strip()] = state.split()[0]
+    return states
+
+
+def _job_state(states, job_id):
+    """State of one job in get_job_states output, with array tasks (<job_id>_<task>) folded into a comma-separated state."""
+    if job_id in states:
+        return states[job_id]
+    tasks = sorted({state for jid, state in states.items() if jid.startswith(f"{job_id}_")})
+    return ",".join(tasks) or None
+
+
+def get_final_job_state(job_id, attempts=3, delay=1.0):
+    """Final state of a job that has already ended, None if sacct does not report one.
+
+    Accounting can lag a moment behind the controller, so a missing or still active
+    state is retried a few times rather than polled for.
+    """
+    for attempt in range(attempts):
+        state = _job_state(get_job_states([job_id]), job_id)
+        if state is not None and _ACTIVE_STATES.isdisjoint(state.split(",")):
+            return state
+        if attempt + 1 < attempts:
+            time.sleep(delay)
+    return None
+
+
+def wait_for_job(job_ids):
+    """Wait for SLURM jobs to complete and return their final states."""
+    # Sorted, deduplicated ids so the same set of jobs always yields the same query
+    pending = tuple(sorted(set(job_ids)))
+    initial = float(os.environ.get("SLURM_UTIL_POLL_INITIAL", 1))
+    maximum = float(os.environ.get("SLURM_UTIL_POLL_MAX", 60))
+    delays = _poll_delays(initial, maximum, float("inf"), factor=1.5)
+    final_states = {}
+    misses = 0
+    status = _StatusPrinter()
+    status(f"Waiting for job(s) {', '.join(pending)} to complete...")
+
+    while pending:
+        # One sacct call per poll covers both running and finished jobs.
+        # Jobs that sacct does not know about yet are still pending, as accounting can lag
+        # behind submission, but a failing sacct or a wrong id must not keep us here forever.
+        states = get_job_states(pending)
+        current = {job_id: _job_state(states, job_id) for job_id in pending}
+        misses = 0 if any(current.values()) else misses + 1
+        if misses >= _MAX_SACCT_MISSES:
+            status(f"sacct reported nothing for job(s) {', '.join(pending)} in {misses} polls, giving up")
+            break
+        for job_id, state in current.items():
+            # An array job is only done once none of its tasks is active
+            if state is not None and _ACTIVE_STATES.isdisjoint(state.split(",")):
+                final_states[job_id] = state
+                status(f"Job {job_id} finished with state {state}")
+        pending = tuple(job_id for job_id in pending if job_id not in final_states)
+
+        active = sorted((job_id, current[job_id]) for job_id in pending if current[job_id])
+        if active:
+            status("Job states: " + ", ".join(f"{job_id} {state}" for job_id, state in active))
+
+        if pending:
+            try:
+                time.sleep(next(delays))
+            except KeyboardInterrupt:
+                status("Keyboard interrupt, exiting...")
+                break
+
+    return final_states
+
+
+def expand_first_hostname(nodelist_expr: str) -> str | None:
+    """Expand a SLURM nodelist expression and return its first hostname."""
+    try:
+        result = subprocess.run([
+            slurm_binary("scontrol"), "show", "hostnames", nodelist_expr
+        ], capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip().partition("\n")[0]
+    except Exception:
+        pass
+    # Fallback: naive parse like foo[01-02] -> foo
+    return nodelist_expr.split(',')[0].split('[')[0]
+
+
 DeviceType = Union[Alvis.DeviceType, Berzelius.DeviceType]
 
 
 
+# Whitespace is trimmed once at import rather than on every call
+_SSH_INFO_TEMPLATE = trim_whitespace("""
+    SSH Connection Information with tmux:
+    Job ID: {job_id}
+    Node(s): {nodes}
+    SSH Port: {ssh_port}
+    tmux session: {job_id}
+
+    To connect and monitor real-time output:
+    ssh -t -p {ssh_port} $USER@{first_node} tmux attach-session -t {job_id}
+
+    To detach from tmux (leave job running): Ctrl-b d
+    To list tmux sessions: tmux list-sessions
+
+    You can check job status with: squeue -j {job_id}
+
+    Note: SSH daemon files are stored in /tmp/slurm_ssh_{job_id} on the compute node
+    """)
+
+
 def print_ssh_info(job_id, cluster):
     """Print SSH connection information for the job."""
     nodes = get_job_nodes(job_id)
     if nodes:
-        # extract first node if multiple
-        first_node = nodes.split(',')[0].split('[')[0]  # Handle node ranges
+        first_node = expand_first_hostname(nodes)
         
         # Calculate SSH port using same formula as in ssh_setup
         ssh_port = cluster.get_ssh_port(job_id)
         
-        ssh_info = trim_whitespace(f"""
-            SSH Connection Information with tmux:
-            Job ID: {job_id}
-            Node(s): {nodes}
-            SSH Port: {ssh_port}
-            tmux session: {job_id}
-
-            To connect and monitor real-time output:
-            ssh -t -p {ssh_port} $USER@{first_node} tmux attach-session -t {job_id}
-                        
-            To detach from tmux (leave job running): Ctrl-b d
-            To list tmux sessions: tmux list-sessions
-            
-            You can check job status with: squeue -j {job_id}
-            
-            Note: SSH daemon files are stored in /tmp/slurm_ssh_{job_id} on the compute node
-            """)
-
-        
-        print(format_in_box(ssh_info.strip()))
+        print(format_in_box(_SSH_INFO_TEMPLATE.format(
+            job_id=job_id, nodes=nodes, ssh_port=ssh_port, first_node=first_node
+        )))
     else:
         job_info = f"Job {job_id} submitted, but node information not yet available."
         status_info = f"Check job status with: squeue -j {job_id}"
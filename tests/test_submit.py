@@ -1,4 +1,13 @@
+import io
+import shutil
 import subprocess
+import sys
+
+import pytest
+
+from slurm_util import submit
+from slurm_util.utils import Berzelius
+
 
 def test_submit():
     # subprocess.run(["submit", "-g", "1", "-t", "0-00:01:00", "tests/test_job.py"], check=True)
@@ -7,5 +16,176 @@ def test_submit():
     # subprocess.run(["submit", "-g", "1", "-t", "0-00:01:00", "-i"], check=True)
 
 
+def _sbatch_script(tmp_path, **kwargs):
+    options = dict(
+        command="",
+        account="acc",
+        gpus_per_node=1,
+        device_type="A100",
+        cpus_per_gpu=16,
+        no_ssh=True,
+        nodes=1,
+        time_alloc="0-00:01:00",
+        shell_env="",
+        interactive=False,
+        stdout_path=str(tmp_path),
+        cluster=Berzelius(),
+        no_uv=False,
+        dist=False,
+        linger=True,
+    )
+    options.update(kwargs)
+    return submit.wrap_in_sbatch(**options)
+
+
+def test_wrap_in_sbatch_array(tmp_path):
+    cmds_file = tmp_path / "my cmds.txt"
+    script = _sbatch_script(tmp_path, array=2, array_file=str(cmds_file))
+    assert "#SBATCH --array=1-2\n" in script
+    assert f"#SBATCH -o {tmp_path}/%A_%a.out\n" in script
+    assert f"'{cmds_file}'" in script
+    # Array tasks never linger, even when asked to
+    assert "exec bash -l" not in script
+
+
+# Stand-ins for the tools the batch script calls. tmux runs the pane command to
+# completion through sh, like a detached session whose pane exits on its own.
+_STUBS = {
+    "uv": 'shift; exec "$@"',
+    "torchrun": 'shift 7; exec "$@"',
+    "srun": 'shift 2; exec "$@"',
+    "scontrol": "echo node01",
+    "tmux": 'case "$1" in new-session) shift 4; [ $# -eq 0 ] || sh -c "$1";; *) exit 1;; esac',
+}
+
+
+def _run_sbatch_script(tmp_path, command, dist=False):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, body in _STUBS.items():
+        stub = bin_dir / name
+        stub.write_text(f"#!/bin/sh\n{body}\n")
+        stub.chmod(0o755)
+    stdout_path = tmp_path / "out dir"
+    script = _sbatch_script(tmp_path, command=command, stdout_path=str(stdout_path), dist=dist, linger=False)
+    env = {
+        "PATH": f"{bin_dir}:/usr/bin:/bin",
+        "TMPDIR": str(tmp_path),
+        "SLURM_JOB_ID": "42",
+        "SLURM_NNODES": "1",
+        "SLURM_NODELIST": "node01",
+    }
+    result = subprocess.run(["bash", "-s"], input=script, env=env, capture_output=True, text=True)
+    return result.returncode, (stdout_path / "42.out").read_text()
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+@pytest.mark.parametrize("dist", [False, True])
+def test_sbatch_script_runs_command_verbatim(tmp_path, dist):
+    command = """printf '%s|%s|%s\\n' "it's" '"quoted"' "$MASTER_PORT"; exit 3"""
+    returncode, output = _run_sbatch_script(tmp_path, command, dist=dist)
+    assert output == "it's|\"quoted\"|15042\n"
+    # The command's exit status becomes the job's, and the private directory is gone
+    assert returncode == 3
+    assert not list(tmp_path.glob("slurm_util_42.*"))
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="needs bash")
+def test_sbatch_script_reports_failure(tmp_path):
+    returncode, _ = _run_sbatch_script(tmp_path, "false")
+    assert returncode == 1
+
+
+def _dry_run(monkeypatch, capsys, *argv):
+    monkeypatch.setattr(submit, "get_cluster", Berzelius)
+    monkeypatch.setattr(submit, "get_default_slurm_acc", lambda: "acc")
+    monkeypatch.setattr(sys, "argv", ["submit", "--dry_run", *argv])
+    return submit.main(), capsys.readouterr()
+
+
+def test_dry_run_array_skips_blank_lines(monkeypatch, capsys, tmp_path):
+    cmds_file = tmp_path / "cmds.txt"
+    cmds_file.write_text('python a.py --name "x y"\n\n   \npython b.py\n')
+    code, captured = _dry_run(monkeypatch, capsys, "--stdout_path", str(tmp_path), "--array", str(cmds_file))
+    assert code == 0
+    assert "#SBATCH --array=1-2" in captured.out
+
+
+def test_dry_run_array_rejects_empty_file(monkeypatch, capsys, tmp_path):
+    cmds_file = tmp_path / "empty.txt"
+    cmds_file.write_text("\n \n")
+    with pytest.raises(SystemExit):
+        _dry_run(monkeypatch, capsys, "--stdout_path", str(tmp_path), "--array", str(cmds_file))
+    assert "no commands" in capsys.readouterr().err
+
+
+def test_help_skips_sacctmgr(monkeypatch, capsys):
+    def lookup():
+        raise AssertionError("--help must not query sacctmgr")
+
+    monkeypatch.setattr(submit, "get_cluster", lookup)
+    monkeypatch.setattr(submit, "get_default_slurm_acc", lookup)
+    monkeypatch.setattr(sys, "argv", ["submit", "--help"])
+    with pytest.raises(SystemExit) as exc:
+        submit.main()
+    assert exc.value.code == 0
+    assert "--device_type" in capsys.readouterr().out
+
+
+class _FakeSbatch:
+    """Stand-in for the sbatch Popen, recording the argv and script it was given."""
+
+    def __init__(self, returncode, stdout=b"Submitted batch job 42\n"):
+        self.returncode = returncode
+        self._stdout = stdout
+
+    def __call__(self, argv, **kwargs):
+        self.argv = argv
+        self.script = self.stdin = io.BytesIO()
+        self.script.close = lambda: None
+        self.stdout = io.BytesIO(self._stdout)
+        return self
+
+    def communicate(self):
+        return self.stdout.read(), b""
+
+
+@pytest.mark.parametrize(
+    "state, sbatch_returncode, expected",
+    [
+        ("COMPLETED", 0, 0),
+        ("FAILED", 1, 1),
+        ("COMPLETED,FAILED", 1, 1),
+        # No accounting record: fall back to the exit code of sbatch --wait
+        (None, 0, 0),
+        (None, 1, 1),
+    ],
+)
+def test_blocking_exit_code(monkeypatch, capsys, tmp_path, state, sbatch_returncode, expected):
+    sbatch = _FakeSbatch(sbatch_returncode)
+    monkeypatch.setattr(submit.subprocess, "Popen", sbatch)
+    monkeypatch.setattr(submit, "get_final_job_state", lambda job_id: state)
+    monkeypatch.setattr(submit, "get_cluster", Berzelius)
+    monkeypatch.setattr(submit, "get_default_slurm_acc", lambda: "acc")
+    monkeypatch.setattr(sys, "argv", ["submit", "--blocking", "--stdout_path", str(tmp_path), "train.py"])
+    assert submit.main() == expected
+    assert sbatch.argv[1:] == ["--wait"]
+    # A blocking job must not linger, or it would only end at its time limit
+    assert b"exec bash -l" not in sbatch.script.getvalue()
+    assert "Submitted batch job 42" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("verbose, tty, shown", [(False, False, False), (True, False, True), (False, True, True)])
+def test_script_box_only_on_a_terminal_or_verbose(monkeypatch, capsys, tmp_path, verbose, tty, shown):
+    monkeypatch.setattr(submit.subprocess, "Popen", _FakeSbatch(0))
+    monkeypatch.setattr(submit, "get_cluster", Berzelius)
+    monkeypatch.setattr(submit, "get_default_slurm_acc", lambda: "acc")
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: tty)
+    argv = ["--verbose"] if verbose else []
+    monkeypatch.setattr(sys, "argv", ["submit", *argv, "--stdout_path", str(tmp_path), "train.py"])
+    assert submit.main() == 0
+    assert ("Running the following sbatch script:" in capsys.readouterr().out) == shown
+
+
 if __name__ == "__main__":
     test_submit()
\ No newline at end of file
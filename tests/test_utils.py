@@ -0,0 +1,157 @@
+import json
+import subprocess
+
+import pytest
+
+from slurm_util import utils
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    """Replace subprocess.run in utils with a queue of canned (returncode, stdout) results."""
+    calls = []
+    results = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        returncode, stdout = results.pop(0) if len(results) > 1 else results[0]
+        return subprocess.CompletedProcess(cmd, returncode, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(utils.subprocess, "run", run)
+    monkeypatch.setattr(utils.time, "sleep", lambda _: None)
+    utils._SQUEUE_CACHE.clear()
+    return calls, results
+
+
+def _squeue_json(*jobs):
+    return json.dumps({"jobs": list(jobs)})
+
+
+@pytest.fixture
+def fresh_association():
+    utils._sacctmgr_association.cache_clear()
+    utils.get_cluster.cache_clear()
+    yield
+    utils._sacctmgr_association.cache_clear()
+    utils.get_cluster.cache_clear()
+
+
+def test_sacctmgr_association(fake_run, fresh_association):
+    calls, results = fake_run
+    results.append((0, "my-acc|berzelius\nother-acc|alvis\n"))
+    assert utils.get_default_slurm_acc() == "my-acc"
+    assert isinstance(utils.get_cluster(), utils.Berzelius)
+    # Account and cluster come from the same single sacctmgr call
+    assert len(calls) == 1
+
+
+def test_sacctmgr_failure_shows_stderr(monkeypatch, fresh_association):
+    def run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="sacctmgr: error: Problem talking to the database")
+
+    monkeypatch.setattr(utils.subprocess, "run", run)
+    with pytest.raises(RuntimeError, match="Problem talking to the database"):
+        utils.get_cluster()
+
+
+def test_get_job_states(fake_run):
+    calls, results = fake_run
+    results.append((0, "12|COMPLETED\n13|CANCELLED by 1234\n14_1|RUNNING\n"))
+    assert utils.get_job_states(["12", "13", "14"]) == {"12": "COMPLETED", "13": "CANCELLED", "14_1": "RUNNING"}
+    assert calls[0][1:3] == ["-j", "12,13,14"]
+
+
+def test_get_job_states_sacct_failure(fake_run):
+    _, results = fake_run
+    results.append((1, ""))
+    assert utils.get_job_states(["12"]) == {}
+
+
+def test_query_job_nodes_json(fake_run, monkeypatch):
+    _, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: True)
+    results.append((0, _squeue_json({"job_id": 7, "job_state": ["RUNNING"], "state_reason": "None", "nodes": "node[01-02]"})))
+    assert utils._query_job_nodes("7") == ("node[01-02]", "RUNNING")
+
+
+def test_query_job_nodes_json_pending(fake_run, monkeypatch):
+    _, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: True)
+    # Older Slurm versions report the state as a plain string
+    results.append((0, _squeue_json({"job_id": 7, "job_state": "PENDING", "state_reason": "Priority", "nodes": ""})))
+    assert utils._query_job_nodes("7") == (None, "PENDING, reason: Priority")
+
+
+def test_query_job_nodes_json_configuring(fake_run, monkeypatch):
+    _, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: True)
+    results.append((0, _squeue_json({"job_id": 7, "job_state": ["RUNNING", "CONFIGURING"], "state_reason": "None", "nodes": "node01"})))
+    assert utils._query_job_nodes("7") == (None, "RUNNING,CONFIGURING")
+
+
+def test_query_job_nodes_json_ignores_other_jobs(fake_run, monkeypatch):
+    _, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: True)
+    results.append((0, _squeue_json({"job_id": 8, "job_state": ["RUNNING"], "state_reason": "None", "nodes": "other"})))
+    assert utils._query_job_nodes("7") == (None, "not in queue")
+
+
+def test_query_job_nodes_text(fake_run, monkeypatch):
+    _, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: False)
+    results.append((0, "RUNNING|node01\n"))
+    assert utils._query_job_nodes("7") == ("node01", "RUNNING")
+    utils._SQUEUE_CACHE.clear()
+    results[:] = [(0, "PENDING|\n")]
+    assert utils._query_job_nodes("7") == (None, "PENDING")
+    utils._SQUEUE_CACHE.clear()
+    results[:] = [(1, "")]
+    assert utils._query_job_nodes("7") == (None, None)
+
+
+def test_get_job_nodes_inside_allocation(fake_run, monkeypatch):
+    calls, results = fake_run
+    results.append((1, ""))
+    monkeypatch.setenv("SLURM_JOB_ID", "7")
+    monkeypatch.setenv("SLURM_JOB_NODELIST", "node[01-02]")
+    assert utils.get_job_nodes("7") == "node[01-02]"
+    assert calls == []
+
+
+def test_get_job_nodes_polls_past_the_squeue_cache(fake_run, monkeypatch):
+    calls, results = fake_run
+    monkeypatch.setattr(utils, "_squeue_supports_json", lambda: False)
+    monkeypatch.delenv("SLURM_JOB_NODELIST", raising=False)
+    utils._NODE_CACHE.clear()
+    results.extend([(0, "PENDING|\n"), (0, "RUNNING|node01\n")])
+    assert utils.get_job_nodes("7") == "node01"
+    assert len(calls) == 2
+
+
+def test_wait_for_job(fake_run):
+    _, results = fake_run
+    results.extend([(0, ""), (0, "12|PENDING\n13|RUNNING\n"), (0, "12|COMPLETED\n13|RUNNING\n"), (0, "13|FAILED\n")])
+    assert utils.wait_for_job(["13", "12", "12"]) == {"12": "COMPLETED", "13": "FAILED"}
+
+
+def test_wait_for_job_array_tasks(fake_run):
+    _, results = fake_run
+    results.extend([(0, "5_1|COMPLETED\n5_2|RUNNING\n"), (0, "5_1|COMPLETED\n5_2|COMPLETED\n")])
+    assert utils.wait_for_job(["5"]) == {"5": "COMPLETED"}
+
+
+def test_get_final_job_state_retries_briefly(fake_run):
+    calls, results = fake_run
+    results.extend([(0, ""), (0, "5_1|COMPLETED\n5_2|COMPLETING\n"), (0, "5_1|COMPLETED\n5_2|FAILED\n")])
+    assert utils.get_final_job_state("5") == "COMPLETED,FAILED"
+    results[:] = [(1, "")]
+    calls.clear()
+    assert utils.get_final_job_state("5") is None
+    assert len(calls) == 3
+
+
+def test_wait_for_job_gives_up_without_sacct(fake_run):
+    calls, results = fake_run
+    results.append((1, ""))
+    assert utils.wait_for_job(["12"]) == {}
+    assert len(calls) == utils._MAX_SACCT_MISSES